@@ -0,0 +1,35 @@
+import pytest
+from lxml import etree
+from trackmatexml import TrackmateXML
+
+
+@pytest.fixture
+def splittrack():
+    edges = [(1, 2), (2, 3), (2, 4), (3, 5), (4, 6)]
+    xml = "".join(
+        f'<Edge SPOT_SOURCE_ID="{s}" SPOT_TARGET_ID="{t}" />' for s, t in edges
+    )
+    tree = etree.ElementTree(
+        etree.fromstring(
+            '<TrackMate version="7.6.0"><Model><AllTracks>'
+            f'<Track name="Track_0">{xml}</Track>'
+            "</AllTracks></Model></TrackMate>"
+        )
+    )
+    tmxml = TrackmateXML()
+    tmxml.loadtree(tree)
+    return tmxml
+
+
+@pytest.mark.parametrize(
+    "duplicate_split, break_split, expected",
+    [
+        (False, False, [(0, 1, [1, 2, 3, 5]), (1, 2, [2, 4, 6])]),
+        (False, True, [(0, 1, [1, 2]), (1, 2, [2, 4, 6]), (1, 3, [2, 3, 5])]),
+        (True, False, [(0, 1, [1, 2, 3, 5]), (1, 2, [1, 2, 4, 6])]),
+        (True, True, [(0, 1, [1, 2]), (1, 2, [1, 2, 4, 6]), (1, 3, [1, 2, 3, 5])]),
+    ],
+)
+def testanalysetrack(splittrack, duplicate_split, break_split, expected):
+    tracks = splittrack.analysetrack("Track_0", duplicate_split, break_split)
+    assert [(t.parent, t.cell, t.spotids.tolist()) for t in tracks] == expected
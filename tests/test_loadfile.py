@@ -1,7 +1,11 @@
+import logging
+import sys
 import pytest
 import tomllib
 from pathlib import Path
-from trackmatexml import TrackmateXML
+import numpy as np
+from lxml import etree
+from trackmatexml import TrackmateXML, TrackmateXMLFile
 
 
 @pytest.fixture
@@ -43,3 +47,162 @@ def testgettraces(datainfo):
                     assert traces[i].mean() == pytest.approx(
                         trackmeans[track][spotproperty][i], 0.001
                     )
+
+
+def testloadmethods(datainfo):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        tree = etree.parse(file)
+        fromtree = TrackmateXML()
+        fromtree.loadtree(tree)
+        assert len(tree.findall(".//Spot")) == datainfo[key]["nspots"]
+        with TrackmateXMLFile(file) as fromstream:
+            for other in (fromtree, fromstream):
+                assert other.version == tmxml.version
+                assert other.spotheader == tmxml.spotheader
+                np.testing.assert_array_equal(other.spots, tmxml.spots)
+                assert other.tracknames == tmxml.tracknames
+                for a, b in zip(other.tracks, tmxml.tracks):
+                    np.testing.assert_array_equal(a, b)
+
+
+def testloadwithouterrors(datainfo, caplog):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def testgetproperty(datainfo):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        idx = tmxml.spotheader.index("FRAME")
+        spotids = tmxml.spots[::-1, tmxml.spotheader.index("ID")].astype(np.int64)
+        frames = tmxml.getproperty(spotids, "FRAME")
+        np.testing.assert_array_equal(frames, tmxml.spots[::-1, idx])
+        with pytest.raises(KeyError):
+            tmxml.getproperty(np.array([-1], dtype=np.int64), "FRAME")
+
+
+def testspotheader():
+    tree = etree.ElementTree(
+        etree.fromstring(
+            '<TrackMate version="7.6.0"><Model><AllSpots nspots="1">'
+            '<SpotsInFrame frame="0">'
+            '<Spot ID="1" name="ID1" label="a" FRAME="0" MEAN_INTENSITY_CH1="2.5" />'
+            "</SpotsInFrame></AllSpots></Model></TrackMate>"
+        )
+    )
+    tmxml = TrackmateXML()
+    tmxml.loadtree(tree)
+    assert tmxml.spotheader == ["ID", "FRAME", "MEAN_INTENSITY_CH1"]
+    np.testing.assert_array_equal(tmxml.spots, [[1.0, 0.0, 2.5]])
+
+
+def testloadwithoutspots(datainfo, caplog):
+    tree = etree.ElementTree(
+        etree.fromstring(
+            '<TrackMate version="7.6.0"><Model><AllSpots nspots="0" />'
+            "</Model></TrackMate>"
+        )
+    )
+    noids = etree.ElementTree(
+        etree.fromstring(
+            '<TrackMate version="7.6.0"><Model><AllSpots nspots="1"><SpotsInFrame>'
+            '<Spot FRAME="0" /></SpotsInFrame></AllSpots></Model></TrackMate>'
+        )
+    )
+    tmxml = TrackmateXML()
+    tmxml.loadtree(tree)
+    assert tmxml.spots.shape == (0, 0)
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+    for key in datainfo:  # reloading must not keep the spot index of a previous file
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml.loadfile(file)
+        spotids = tmxml.spots[:, tmxml.spotheader.index("ID")].astype(np.int64)
+        tmxml.loadtree(tree)
+        assert tmxml.getproperty(spotids, "FRAME").size == 0
+        tmxml.loadfile(file)
+        tmxml.loadtree(noids)
+        with pytest.raises(KeyError):
+            tmxml.getproperty(spotids, "FRAME")
+
+
+def testspotblocks(datainfo, monkeypatch):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        monkeypatch.setattr(sys.modules[TrackmateXML.__module__], "_SPOTBLOCK", 5)
+        blocked = TrackmateXML()
+        blocked.loadfile(file)
+        monkeypatch.undo()
+        np.testing.assert_array_equal(blocked.spots, tmxml.spots)
+        assert blocked.spots.flags.f_contiguous
+
+
+def testloadtwice(datainfo):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        tmxml.loadfile(file)
+        ntracks = datainfo[key]["ntracks"]
+        assert len(tmxml.tracknames) == 2 * ntracks
+        assert len(tmxml.tracks) == 2 * ntracks
+        for i in range(ntracks):
+            np.testing.assert_array_equal(tmxml.tracks[i], tmxml.tracks[i + ntracks])
+            first = tmxml.analysetrackid(i)
+            second = tmxml.analysetrackid(i + ntracks)
+            assert [t.spotids.tolist() for t in first] == [
+                t.spotids.tolist() for t in second
+            ]
+
+
+def testtracks(datainfo):
+    for key in datainfo:
+        file = Path(Path.cwd(), "tests", "testdata", key + ".xml")
+        tmxml = TrackmateXML()
+        tmxml.loadfile(file)
+        tracks = tmxml.tracks
+        nedges = [len(t.findall("Edge")) for t in etree.parse(file).iter("Track")]
+        assert [len(t) for t in tracks] == nedges
+        np.testing.assert_array_equal(tracks[-1], tracks[len(tracks) - 1])
+        assert len(tracks[:]) == len(tracks)
+        with pytest.raises(IndexError):
+            tracks[len(tracks)]
+        last = [t.spotids.tolist() for t in tmxml.analysetrackid(len(tracks) - 1)]
+        assert last
+        assert [t.spotids.tolist() for t in tmxml.analysetrackid(-1)] == last
+
+
+def errors(caplog):
+    return [r.getMessage() for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def testnottrackmate(caplog):
+    tmxml = TrackmateXML()
+    tmxml.loadtree(etree.ElementTree(etree.fromstring("<Foo><Bar/></Foo>")))
+    assert not tmxml
+    assert errors(caplog) == ["Not a TrackMateXML"]
+
+
+def testunrecognisedelements(caplog):
+    tmxml = TrackmateXML()
+    tmxml.loadtree(
+        etree.ElementTree(
+            etree.fromstring(
+                '<TrackMate version="7.6.0"><Foo /><Model><Bar /><AllSpots />'
+                "</Model><Baz /></TrackMate>"
+            )
+        )
+    )
+    messages = errors(caplog)
+    assert len(messages) == 3
+    for tag in ("Foo", "Bar", "Baz"):
+        assert any(f"Element {tag} " in m for m in messages)
@@ -22,20 +22,122 @@ import sys
 from contextlib import AbstractContextManager
 from pathlib import Path
 from types import TracebackType
-from typing import Any, Union, Optional, Type, BinaryIO, List, Dict
+from typing import (
+    Any,
+    Union,
+    Optional,
+    Type,
+    BinaryIO,
+    List,
+    Dict,
+    Tuple,
+    Iterable,
+    Callable,
+    TypeVar,
+    cast,
+    overload,
+    Sequence,
+)
 import numpy as np
 from lxml import etree
 from dataclasses import dataclass
 
+F = TypeVar("F", bound=Callable[..., Any])
+
+# elements that get start and end events while loading, all others are skipped
+_TAGS = (
+    "TrackMate",
+    "Log",
+    "Model",
+    "FeatureDeclarations",
+    "AllSpots",
+    "Spot",
+    "AllTracks",
+    "Track",
+    "DisplaySettings",
+    # not required for displaying intensity tracks, these are only cleared
+    "FilteredTracks",
+    "Settings",
+    "GUIState",
+)
+# spots are converted to float64 per block of this many, to bound the collected strings
+_SPOTBLOCK = 1 << 16
+# plain strings, lxml's default smart strings keep a reference to their Edge element
+_SOURCE_IDS = etree.XPath("./Edge/@SPOT_SOURCE_ID", smart_strings=False)
+_TARGET_IDS = etree.XPath("./Edge/@SPOT_TARGET_ID", smart_strings=False)
+# the children expected in the TrackMate root and in the Model, others are reported
+_CHILDREN = {
+    "TrackMate": ("Log", "Model", "Settings", "GUIState", "DisplaySettings"),
+    "Model": ("FeatureDeclarations", "AllSpots", "AllTracks", "FilteredTracks"),
+}
+
+
+def _njit(func: F) -> F:
+    """
+    Compile a function with numba if it is installed, otherwise it runs as plain python.
+    """
+    try:
+        from numba import njit  # type: ignore[import-not-found, unused-ignore]
+    except ImportError:
+        return func
+    return cast(F, njit(cache=True)(func))
+
+
+def _is_float(value: Union[str, bytes]) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
 
 @dataclass
 class AnalyzedTrack:
     parent: int
     cell: int
-    spotids: np.ndarray[Any, np.dtype[np.int32]]
+    spotids: np.ndarray[Any, np.dtype[np.int64]]
     track: bool
 
 
+class TrackEdges(Sequence[np.ndarray[Any, np.dtype[np.int64]]]):
+    """
+    Read-only sequence of tracks in an edge table, track i is
+    edges[offsets[i] : offsets[i + 1]].
+    """
+
+    def __init__(
+        self,
+        edges: np.ndarray[Any, np.dtype[np.int64]],
+        offsets: np.ndarray[Any, np.dtype[np.int64]],
+    ) -> None:
+        self._edges = edges
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> np.ndarray[Any, np.dtype[np.int64]]: ...
+
+    @overload
+    def __getitem__(
+        self, index: slice
+    ) -> List[np.ndarray[Any, np.dtype[np.int64]]]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[
+        np.ndarray[Any, np.dtype[np.int64]], List[np.ndarray[Any, np.dtype[np.int64]]]
+    ]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("track index out of range")
+        return self._edges[self._offsets[index] : self._offsets[index + 1]]
+
+
 class TrackmateXMLFile(AbstractContextManager[Any]):
     """
     Context manager for handeling TrackmateXML files
@@ -92,11 +194,23 @@ class TrackmateXML:
         self.spatialunits = ""  # type: str
         self.timeunits = ""  # type: str
         self.spotheader = []  # type:List[str]
-        self.spots = np.zeros((0, 0), dtype=float)
-        self.tracks = []  # type: List[np.ndarray[Any, np.dtype[np.int32]]]
+        self.spots = np.zeros((0, 0), dtype=np.float64)
+        self._columns = {}  # type: Dict[str, np.ndarray[Any, np.dtype[np.float64]]]
+        self._ids_sorted = np.zeros(0, dtype=np.int64)
+        self._sort_order = np.zeros(0, dtype=np.intp)
+        self._edges = np.zeros((0, 2), dtype=np.int64)
+        self._track_offsets = np.zeros(1, dtype=np.int64)
         self.tracknames = []  # type: List[str]
+        self._trackname_to_id = {}  # type: Dict[str, int]
         self.displaysettings = {}  # type: Dict[str, str]
 
+    @property
+    def tracks(self) -> "TrackEdges":
+        """
+        The (source, target) edges of every track, as views into a single edge table.
+        """
+        return TrackEdges(self._edges, self._track_offsets)
+
     def __bool__(self) -> bool:
         if self.version:
             return True
@@ -104,19 +218,24 @@ class TrackmateXML:
             return False
 
     def loadstream(self, fp: BinaryIO) -> None:
-        self._load(etree.parse(fp))
+        """
+        Load a TrackMate XML from a binary stream
+        """
+        self._stream(self._iterparse(fp))
 
     def loadfile(self, pth: Union[str, os.PathLike[Any]]) -> None:
         """
         Load a TrackMate XML-file
         """
-        self._load(etree.parse(pth))
+        self._stream(self._iterparse(pth))
 
     def loadtree(self, tree: etree._ElementTree) -> None:
         """
         Load a Trackmate XML-tree
         """
-        self._load(tree)
+        self._stream(
+            etree.iterwalk(tree, events=("start", "end"), tag=_TAGS), clear=False
+        )
 
     def gettraces(
         self,
@@ -132,28 +251,114 @@ class TrackmateXML:
         return [self.getproperty(track.spotids, spot_property) for track in tracks]
 
     def getproperty(
-        self, spotids: np.ndarray[Any, np.dtype[np.int32]], spot_property: str
+        self, spotids: np.ndarray[Any, np.dtype[np.int64]], spot_property: str
     ) -> np.ndarray[Any, np.dtype[np.float64]]:
         """
         Get properties from spotids
         """
-        if spot_property not in self.spotheader:
+        if spot_property not in self._columns:
             self.logger.error(f"{spot_property} not in spot properties")
-            return np.zeros((0, 0), dtype=float)
-        prop_idx = self.spotheader.index(spot_property)
-        spotid_idx = self.spotheader.index("ID")
-        res = np.zeros(len(spotids), dtype=np.float64)
-        for i, s in enumerate(spotids):
-            res[i] = self.spots[self.spots[:, spotid_idx] == s, prop_idx][0]
-        return res
-
-    def _load(self, tree: etree._ElementTree) -> None:
-        self.logger.info("Getting version")
-        self._getversion(tree.getroot())
-        self.logger.info("Analyzing tree")
-        self._analysetree(tree)
+            return np.zeros((0, 0), dtype=np.float64)
+        spotids = np.asarray(spotids, dtype=np.int64)
+        pos = np.searchsorted(self._ids_sorted, spotids)
+        found = pos < self._ids_sorted.size
+        found[found] = self._ids_sorted[pos[found]] == spotids[found]
+        if not found.all():
+            raise KeyError(f"Spot IDs not found: {spotids[~found]}")
+        return self._columns[spot_property][self._sort_order[pos]]
+
+    @staticmethod
+    def _iterparse(
+        source: Union[str, os.PathLike[Any], BinaryIO],
+    ) -> Iterable[Tuple[str, etree._Element]]:
+        events = etree.iterparse(
+            source,
+            events=("start", "end"),
+            tag=_TAGS,
+            huge_tree=True,  # no depth/size limits for large files
+            collect_ids=False,  # no need for an xml:id hash table
+            remove_blank_text=True,
+        )  # type: Iterable[Tuple[str, etree._Element]]
+        return events
+
+    def _stream(
+        self, events: Iterable[Tuple[str, etree._Element]], clear: bool = True
+    ) -> None:
+        """
+        Load the XML in a single pass over the start and end events of the elements in
+        _TAGS, dispatching on their tag. Other elements (e.g. edges) are read through
+        their parent. With clear, every element is freed once it has been processed.
+        Spot attributes are collected as strings and converted per block of
+        _SPOTBLOCK spots, edge IDs are collected as strings until AllTracks.
+        """
+        self.logger.info("Loading XML")
+        rootseen = False
+        spotcolumns = []  # type: List[List[str]]
+        spotblocks = []  # type: List[np.ndarray[Any, np.dtype[np.float64]]]
+        edgecolumns = [[], []]  # type: List[List[str]]
+        trackoffsets = [0]  # type: List[int]
+        for event, element in events:
+            tag = element.tag
+            if event == "start":
+                if not rootseen:
+                    rootseen = True
+                    self._getversion(element.getroottree().getroot())
+                if tag == "Model":
+                    self._getmodel(element)
+                parent = element.getparent()
+                if parent is not None and tag in _CHILDREN.get(parent.tag, ()):
+                    self._unrecognised(
+                        element.itersiblings(preceding=True), _CHILDREN[parent.tag]
+                    )
+                continue
+            if tag in _CHILDREN:  # elements after the last expected child
+                self._unrecognised(element.iterchildren(reversed=True), _CHILDREN[tag])
+            if tag == "Spot":
+                if not spotcolumns:
+                    self._getspotheader(element)
+                    spotcolumns = [[] for _ in self.spotheader]
+                self._getspot(element, spotcolumns, spotblocks)
+            elif tag == "AllSpots":
+                self._setspots(spotcolumns, spotblocks)
+            elif tag == "Track":
+                self._gettrack(element, edgecolumns, trackoffsets)
+            elif tag == "AllTracks":
+                self._settracks(edgecolumns, trackoffsets)
+            elif tag == "FeatureDeclarations":
+                pass  # would be nice if the feature declaration would actually list the features in the xml, but instead it lists all possible features
+            elif tag == "Log":
+                self._getlog(element)
+            elif tag == "DisplaySettings":
+                self._get_display_settings(element)
+            if clear:
+                self._clear(element)
+        if not rootseen:
+            self.logger.error("Not a TrackMateXML")
         self.logger.info("Finished loading")
 
+    def _unrecognised(
+        self, elements: Iterable[etree._Element], expected: Tuple[str, ...]
+    ) -> None:
+        """
+        Report elements until the first expected one. Unexpected elements get no events,
+        so they are checked from the expected sibling that follows them.
+        """
+        for element in elements:
+            if element.tag in expected:
+                break
+            self.logger.error(f"Unrecognised element {element}")
+
+    @staticmethod
+    def _clear(element: etree._Element) -> None:
+        """
+        Free a processed element and the already processed siblings before it.
+        """
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
     def getversion(self) -> str:
         """
         Get the version of the TrackmateXML data as string.
@@ -162,7 +367,7 @@ class TrackmateXML:
 
     def _getversion(self, root: etree._Element) -> None:
         if root.tag == "TrackMate":
-            v = root.attrib.get("version", "")
+            v = root.get("version", "")
             if v == "":
                 self.logger.error(f"Invalid Version")
             elif type(v) == bytes:
@@ -172,22 +377,6 @@ class TrackmateXML:
         else:
             self.logger.error("Not a TrackMateXML")
 
-    def _analysetree(self, tree: etree._ElementTree) -> None:
-        root = tree.getroot()
-        for element in root:
-            if element.tag == "Log":
-                self._getlog(element)
-            elif element.tag == "Model":
-                self._getmodel(element)
-            elif element.tag == "Settings":
-                self._getsettings(element)
-            elif element.tag == "GUIState":
-                self._get_gui_state(element)
-            elif element.tag == "DisplaySettings":
-                self._get_display_settings(element)
-            else:
-                self.logger.error(f"Unrecognised element {element}")
-
     def _getlog(self, element: etree._Element) -> None:
         self.log = element.text
 
@@ -195,72 +384,98 @@ class TrackmateXML:
         self.displaysettings = json.loads(str(element.text))
 
     def _getmodel(self, element: etree._Element) -> None:
-        self.spatialunits = str(element.attrib.get("spatialunits", ""))
-        self.timeunits = str(element.attrib.get("timeunits", ""))
-        for subelement in element:
-            if subelement.tag == "FeatureDeclarations":
-                pass  # would be nice if the feature declaration would actually list the features in the xml, but instead it lists all possible features
-            elif subelement.tag == "AllSpots":
-                self._getspots(subelement)
-            elif subelement.tag == "AllTracks":
-                self._gettracks(subelement)
-            elif subelement.tag == "FilteredTracks":
-                self._getfilteredtracks(subelement)
-            else:
-                self.logger.error(f"Unrecognised element {element}")
+        self.spatialunits = str(element.get("spatialunits", ""))
+        self.timeunits = str(element.get("timeunits", ""))
 
-    def _getsettings(self, element: etree._Element) -> None:
+    def _getspotheader(self, spot: etree._Element) -> None:
         """
-        Could be added, but is not required for displaying intensity tracks
+        Construct the header from the numeric attributes of a spot.
         """
-        pass
+        self.spotheader = [str(k) for k, v in spot.items() if _is_float(v)]
 
-    def _getfilteredtracks(self, element: etree._Element) -> None:
-        """
-        Could be added, but is not required for displaying intensity tracks
-        """
-        pass
+    def _getspot(
+        self,
+        spot: etree._Element,
+        columns: List[List[str]],
+        blocks: List[np.ndarray[Any, np.dtype[np.float64]]],
+    ) -> None:
+        for k, column in zip(self.spotheader, columns):
+            column.append(str(spot.get(k, "nan")))
+        if columns and len(columns[0]) >= _SPOTBLOCK:
+            blocks.append(self._spotblock(columns))
 
-    def _get_gui_state(self, element: etree._Element) -> None:
+    @staticmethod
+    def _spotblock(columns: List[List[str]]) -> np.ndarray[Any, np.dtype[np.float64]]:
         """
-        Could be added, but does not seem usefull in python.
+        Convert the collected spot columns to numpy with one call per column
+        and empty them for the next block.
         """
-        pass
-
-    def _getspots(self, element: etree._Element) -> None:
+        nspots = len(columns[0]) if columns else 0
+        block = np.empty((nspots, len(columns)), dtype=np.float64, order="F")
+        for i, column in enumerate(columns):
+            block[:, i] = np.asarray(column, dtype=np.float64)
+            column.clear()
+        return block
+
+    def _setspots(
+        self,
+        columns: List[List[str]],
+        blocks: List[np.ndarray[Any, np.dtype[np.float64]]],
+    ) -> None:
         """
-        Put all numeric spot data in a numpy array.
+        Join the converted blocks and the remaining spots into one array
+        and sort the spot IDs to look up their row.
+        The array is stored column-major so every property is a contiguous column.
         """
-        nspots = int(str(element.attrib.get("nspots", "0")))
-        # construct header
-        spotid = 0
-        spot = element[0][0]
-        keys = [str(a) for a in spot.attrib]
-        for k in keys:
-            try:
-                float(spot.attrib[k])
-            except ValueError:  # remove keys we cannot convert to floats
-                keys.remove(k)
-        self.spotheader = keys
-        self.spots = np.zeros((nspots, len(keys)), dtype=np.float64)
-        for sif in element:
-            for spot in sif:
-                for i, k in enumerate(keys):
-                    self.spots[spotid, i] = float(str(spot.attrib.get(k, "nan")))
-                spotid += 1
-
-    def _gettracks(self, element: etree._Element) -> None:
+        if not columns:  # no spots, so no header either
+            self.spotheader = []
+        blocks.append(self._spotblock(columns))
+        nspots = sum(len(block) for block in blocks)
+        self.spots = np.empty((nspots, len(columns)), dtype=np.float64, order="F")
+        np.concatenate(blocks, out=self.spots)
+        self._columns = {k: self.spots[:, i] for i, k in enumerate(self.spotheader)}
+        self._ids_sorted = np.zeros(0, dtype=np.int64)
+        self._sort_order = np.zeros(0, dtype=np.intp)
+        if "ID" not in self._columns:
+            if self.spotheader:
+                self.logger.error("Spots have no ID")
+            return
+        ids = self._columns["ID"].astype(np.int64)
+        self._sort_order = np.argsort(ids, kind="stable")
+        self._ids_sorted = ids[self._sort_order]
+
+    def _gettrack(
+        self,
+        track: etree._Element,
+        edgecolumns: List[List[str]],
+        trackoffsets: List[int],
+    ) -> None:
         """
-        Importing only source and target into a numpy array and listing the trackname.
+        Importing only source and target and listing the trackname.
         We could import more, but it is not needed for displaying intensity tracks.
         """
-        for track in element:
-            t = np.zeros((len(track), 2), dtype=np.int32)
-            for i, edge in enumerate(track):
-                t[i, 0] = int(str(edge.attrib.get("SPOT_SOURCE_ID", "-1")))
-                t[i, 1] = int(str(edge.attrib.get("SPOT_TARGET_ID", "-1")))
-            self.tracks.append(t)
-            self.tracknames.append(str(track.attrib.get("name", "unknown")))
+        edgecolumns[0].extend(cast(List[str], _SOURCE_IDS(track)))
+        edgecolumns[1].extend(cast(List[str], _TARGET_IDS(track)))
+        trackoffsets.append(len(edgecolumns[0]))
+        name = str(track.get("name", "unknown"))
+        self._trackname_to_id.setdefault(name, len(self.tracknames))
+        self.tracknames.append(name)
+
+    def _settracks(self, edgecolumns: List[List[str]], trackoffsets: List[int]) -> None:
+        """
+        Append the edges of all tracks to one table, track i is in rows
+        _track_offsets[i] to _track_offsets[i + 1]. Like tracknames, the table
+        grows when another file is loaded into the same object.
+        """
+        edges = np.column_stack(
+            [
+                np.fromiter(column, dtype=np.int64, count=len(column))
+                for column in edgecolumns
+            ]
+        )
+        offsets = np.array(trackoffsets[1:], dtype=np.int64) + len(self._edges)
+        self._edges = np.concatenate((self._edges, edges))
+        self._track_offsets = np.concatenate((self._track_offsets, offsets))
 
     def analysetrack(
         self, trackname: str, duplicate_split: bool = False, break_split: bool = False
@@ -268,7 +483,9 @@ class TrackmateXML:
         """
         Traces a track to find the sequence of spotids
         """
-        trackid = self.tracknames.index(trackname)
+        if trackname not in self._trackname_to_id:
+            raise ValueError(f"{trackname} is not in tracknames")
+        trackid = self._trackname_to_id[trackname]
         return self.analysetrackid(trackid, duplicate_split, break_split)
 
     def analysetrackid(
@@ -284,72 +501,144 @@ class TrackmateXML:
                 f"Track has {unique_sources.size} startingpoints. Cannot follow track."
             )
             return []
-        cellid = 1
-        traced_tracks = [
+        # number the spots of the track 0..n-1 and bucket the edges by source
+        spots, edges = np.unique(track, return_inverse=True)
+        edges = edges.reshape(track.shape).astype(np.int64, copy=False)
+        order = np.argsort(edges[:, 0], kind="stable")
+        bounds = np.searchsorted(edges[order, 0], np.arange(spots.size + 1))
+        parents, cells, spotidx, offsets = _trace(
+            bounds,
+            edges[order, 1],
+            int(np.searchsorted(spots, unique_sources[0])),
+            duplicate_split,
+            break_split,
+        )
+        spotids = spots[spotidx].astype(np.int64, copy=False)
+        return [
             AnalyzedTrack(
-                parent=0,
-                cell=cellid,
-                spotids=track[np.argwhere(track[:, 0] == unique_sources), :].flatten(),
-                track=True,
+                parent=int(parents[i]),
+                cell=int(cells[i]),
+                spotids=spotids[offsets[i] : offsets[i + 1]],
+                track=False,
             )
+            for i in range(len(parents))
         ]
-        while any([x.track for x in traced_tracks]):
-            for traced_track in traced_tracks:
-                if not traced_track.track:
-                    continue
-                traced_track_ids = traced_track.spotids
-                targetidx = np.argwhere(
-                    track[:, 0] == traced_track_ids[-1]
-                ).flatten()  # do we find the last index in the sources?
-                if targetidx.size == 0:
-                    traced_track.track = False  # reached the end of the track
-                elif targetidx.size == 1:
-                    traced_track.spotids = np.concatenate(
-                        (traced_track_ids, track[targetidx, 1])
-                    )  # append target to track
+
+
+@_njit
+def _append(
+    table: np.ndarray[Any, np.dtype[np.int64]], n: int, row: Tuple[int, ...]
+) -> Tuple[np.ndarray[Any, np.dtype[np.int64]], int]:
+    """
+    Set row n of a table, doubling the table when it is full.
+    """
+    if n == table.shape[0]:
+        grown = np.empty((2 * table.shape[0], table.shape[1]), dtype=table.dtype)
+        grown[:n] = table
+        table = grown
+    for j in range(len(row)):
+        table[n, j] = row[j]
+    return table, n + 1
+
+
+@_njit
+def _branch(
+    nodes: np.ndarray[Any, np.dtype[np.int64]],
+    nnodes: int,
+    target: int,
+    tail: int,
+    duplicate_split: bool,
+) -> Tuple[np.ndarray[Any, np.dtype[np.int64]], int]:
+    """
+    Add the nodes of a new track that splits off from the node tail towards target.
+    """
+    if duplicate_split:  # a copy of the history is added to each track
+        return _append(nodes, nnodes, (target, tail))
+    nodes, nnodes = _append(nodes, nnodes, (nodes[tail, 0], -1))
+    return _append(nodes, nnodes, (target, nnodes - 1))
+
+
+@_njit
+def _trace(
+    bounds: np.ndarray[Any, np.dtype[np.int64]],
+    targets: np.ndarray[Any, np.dtype[np.int64]],
+    start: int,
+    duplicate_split: bool,
+    break_split: bool,
+) -> Tuple[
+    np.ndarray[Any, np.dtype[np.int64]],
+    np.ndarray[Any, np.dtype[np.int64]],
+    np.ndarray[Any, np.dtype[np.int64]],
+    np.ndarray[Any, np.dtype[np.int64]],
+]:
+    """
+    Traces a track starting at spot start. Spots are numbered 0..n-1 and the targets
+    of spot x are targets[bounds[x] : bounds[x + 1]].
+    Spots are stored as nodes (spot, previous node) so a duplicated history is shared
+    instead of copied. Returns the parent and cell of every traced track and their
+    concatenated spots with the offset of each track.
+    """
+    nodes = np.empty((2 * targets.size + 2, 2), dtype=np.int64)
+    nnodes = 0
+    # parent, cell, last node, tracking and length of each traced track
+    traced = np.empty((8, 5), dtype=np.int64)
+    ntraced = 0
+    tail = -1
+    for j in range(bounds[start], bounds[start + 1]):
+        nodes, nnodes = _append(nodes, nnodes, (start, tail))
+        nodes, nnodes = _append(nodes, nnodes, (targets[j], nnodes - 1))
+        tail = nnodes - 1
+    cellid = 1
+    traced, ntraced = _append(traced, ntraced, (0, cellid, tail, 1, nnodes))
+    while traced[:ntraced, 3].any():
+        i = 0
+        while i < ntraced:  # tracks added during this pass are visited as well
+            if traced[i, 3]:
+                tail = traced[i, 2]
+                lo = bounds[nodes[tail, 0]]
+                hi = bounds[nodes[tail, 0] + 1]
+                if hi == lo:
+                    traced[i, 3] = 0  # reached the end of the track
+                elif hi - lo == 1:
+                    nodes, nnodes = _append(nodes, nnodes, (targets[lo], tail))
+                    traced[i, 2] = nnodes - 1  # append target to track
+                    traced[i, 4] += 1
                 else:  # multiple targets, a split
-                    if duplicate_split:  # a copy of the history is added to each track
-                        for i in range(1, targetidx.size):
-                            spotids = np.concatenate(
-                                (traced_track_ids, track[targetidx[i], 1].flatten())
-                            )
-                            cellid += 1
-                            new_track = AnalyzedTrack(
-                                parent=traced_track.cell,
-                                cell=cellid,
-                                spotids=spotids,
-                                track=True,
-                            )
-                            traced_tracks.append(new_track)
-                    else:
-                        for i in range(1, targetidx.size):
-                            spotids = track[targetidx[i], :]
-                            cellid += 1
-                            new_track = AnalyzedTrack(
-                                parent=traced_track.cell,
-                                cell=cellid,
-                                spotids=spotids,
-                                track=True,
-                            )
-                            traced_tracks.append(new_track)
+                    length = traced[i, 4] + 1 if duplicate_split else 2
+                    for j in range(lo + 1, hi):
+                        nodes, nnodes = _branch(
+                            nodes, nnodes, targets[j], tail, duplicate_split
+                        )
+                        cellid += 1
+                        traced, ntraced = _append(
+                            traced,
+                            ntraced,
+                            (traced[i, 1], cellid, nnodes - 1, 1, length),
+                        )
                     if break_split:
-                        traced_track.track = False  # end the parent
-                        if duplicate_split:
-                            spotids = np.concatenate(
-                                (traced_track_ids, track[targetidx[0], 1].flatten())
-                            )
-                        else:
-                            spotids = track[targetidx[0], :]  # start child
+                        traced[i, 3] = 0  # end the parent
+                        nodes, nnodes = _branch(
+                            nodes, nnodes, targets[lo], tail, duplicate_split
+                        )  # start child
                         cellid += 1
-                        new_track = AnalyzedTrack(
-                            parent=traced_track.cell,
-                            cell=cellid,
-                            spotids=spotids,
-                            track=True,
+                        traced, ntraced = _append(
+                            traced,
+                            ntraced,
+                            (traced[i, 1], cellid, nnodes - 1, 1, length),
                         )
-                        traced_tracks.append(new_track)
                     else:
-                        traced_track.spotids = np.concatenate(
-                            (traced_track_ids, track[targetidx[0], 1].flatten())
-                        )  # append target to track
-        return traced_tracks
+                        nodes, nnodes = _append(nodes, nnodes, (targets[lo], tail))
+                        traced[i, 2] = nnodes - 1  # append target to track
+                        traced[i, 4] += 1
+            i += 1
+    offsets = np.zeros(ntraced + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(traced[:ntraced, 4])
+    spotids = np.empty(offsets[ntraced], dtype=np.int64)
+    for i in range(ntraced):
+        k = offsets[i + 1]
+        node = traced[i, 2]
+        while node != -1:
+            k -= 1
+            spotids[k] = nodes[node, 0]
+            node = nodes[node, 1]
+    return traced[:ntraced, 0], traced[:ntraced, 1], spotids, offsets